@@ -30,6 +30,10 @@ setup(name='ya-ecs-ctl',
             'colored==1.3.5',
             'Jinja2>=2.8',
       ],
+      extras_require={
+            'async': ['aioboto3'],
+            'json': ['orjson'],
+      },
       entry_points={
           'console_scripts': [
               'ecs=ya_ecs_ctl.main:main'
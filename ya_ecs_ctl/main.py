@@ -1,57 +1,130 @@
 #!/usr/bin/env python3
 import os
+import sys
+import re
+import copy
 import json
-import yaml
 import click
 import logging
-import boto3
 import pprint
-import copy
-from itertools import groupby
+import functools
+import threading
+import heapq
+from itertools import groupby, chain
+from operator import itemgetter
+from concurrent.futures import as_completed, wait
 from easysettings import JSONSettings as Settings
 from prompt_toolkit import prompt
-from ya_ecs_ctl.utils import ChoicesCompleter, ChoicesValidator, lowerCaseFirstLetter, change_keys, chunks, dump, reset, print_table
-from botocore.exceptions import ClientError
+from ya_ecs_ctl.utils import ChoicesCompleter, ChoicesValidator, lowerCaseFirstLetter, change_keys, chunks, dump, reset, print_table, parallel_map, arn_id, Batcher, naturaltime, truncate, join_truncated, MAX_WORKERS, thread_pool, \
+    ttl_cache_disk, clear_disk_cache, set_disk_cache_enabled, set_pretty_tables, \
+    set_json_output, json_output_enabled, print_json, write_json_output, msg_stream
 from colored import fg
-from jinja2 import Template
-import humanize
 import datetime
+import importlib.util
 
-settings = Settings()
+# colored builds the escape code from the name on each call, so look them up once
+GREEN = fg('green')
+RED = fg('red')
 
 settings_file = ".settings.conf"
-if not os.path.exists(settings_file):
-    settings.save(settings_file)
-else:
-    settings.load(settings_file)
+
+@functools.lru_cache(maxsize=None)
+def get_settings():
+    """
+    Settings are loaded (or created) on first use so commands that never need them skip the file I/O.
+    """
+    settings = Settings()
+
+    if not os.path.exists(settings_file):
+        settings.save(settings_file)
+    else:
+        settings.load(settings_file)
+
+    return settings
 
 
 log = logging.getLogger(__name__)
 
 # Boto objects
-ecr = boto3.client('ecr')
-ecs = boto3.client('ecs')
-ec2 = boto3.client('ec2')
-elb = boto3.client('elbv2')
-events = boto3.client('events')
-logs = boto3.client('logs')
+# boto3 (and friends) are imported on first use rather than at startup, it dominates CLI start up time.
+
+@functools.lru_cache(maxsize=1)
+def get_boto_config():
+    from botocore.config import Config
+
+    # Adaptive retries absorb throttling from the concurrent describe calls, and the larger pool keeps
+    # those threads from queueing on (or discarding) connections. Keepalive lets sequential calls reuse sockets.
+    # Short timeouts so a stalled connection is retried rather than hanging the CLI (botocore defaults to 60s).
+    return Config(retries={'max_attempts': 10, 'mode': 'adaptive'}, max_pool_connections=50, tcp_keepalive=True,
+                  connect_timeout=3, read_timeout=15)
+
+@functools.lru_cache(maxsize=1)
+def get_session():
+    import boto3
+
+    # One session for the process so config/credentials are only resolved once
+    return boto3.session.Session()
+
+
+class LazyClient(object):
+    """
+    Stands in for a boto3 client, building it on first use so a command only pays for the clients it touches.
+    """
+    lock = threading.Lock()
+
+    def __init__(self, service_name):
+        self.service_name = service_name
+        self.client = None
+
+    def __getattr__(self, name):
+        if self.client is None:
+            # creating clients from a shared session is not thread safe
+            with self.lock:
+                if self.client is None:
+                    self.client = get_session().client(self.service_name, config=get_boto_config())
 
+        return getattr(self.client, name)
 
-def get_cluster_ids(ecs):
-    clusters = ecs.list_clusters()['clusterArns']
-    return [c.split(':cluster/')[1] for c in clusters]
 
+ecr = LazyClient('ecr')
+ecs = LazyClient('ecs')
+ec2 = LazyClient('ec2')
+elb = LazyClient('elbv2')
+events = LazyClient('events')
+logs = LazyClient('logs')
 
+
+def cache_key():
+    # cached AWS metadata is only valid for the account/region it came from. The access key identifies
+    # the credentials in use even when they come from env vars (aws-vault, SSO, CI roles) rather than a profile.
+    # It is only ever stored hashed.
+    credentials = get_session().get_credentials()
+
+    return [get_default_region(), os.environ.get('AWS_PROFILE'), credentials.access_key if credentials else None]
+
+
+@ttl_cache_disk(ttl=3600, key=cache_key)
+def get_cluster_ids():
+    clusters = ecs.get_paginator('list_clusters').paginate().build_full_result()['clusterArns']
+    return [arn_id(c) for c in clusters]
+
+
+@ttl_cache_disk(ttl=60, key=cache_key)
 def get_clusters_info(cluster_ids):
     return ecs.describe_clusters(clusters=cluster_ids)['clusters']
 
 
 
+arn_region = re.compile(r'arn:[^:]+:[^:]+:([^:]*):')
+
 def print_clusters_info(clusters_info):
+    if json_output_enabled():
+        return print_json('clusters', clusters_info)
+
     header = ['Region', 'Cluster', 'Container Instances', 'Running Tasks', 'Active Services']
 
     data = [[
-        c['clusterArn'].split("arn:aws:ecs:")[1].split(":")[0],
+        arn_region.match(c['clusterArn']).group(1),
         c['clusterName'],
         c['registeredContainerInstancesCount'],
         c['runningTasksCount'],
@@ -61,12 +134,18 @@ def print_clusters_info(clusters_info):
     print_table(header, data)
 
 def print_msg_success(msg):
-    print(fg('green') + "\n\t" + msg + reset)
+    print(GREEN + "\n\t" + msg + reset, file=msg_stream())
+
+def print_msg_error(msg):
+    print(RED + "\n\t" + msg + reset, file=msg_stream())
 
 
 def get_default_cluster():
-    if not settings.get('cluster'):
-        cluster_ids = get_cluster_ids(ecs)
+    if not get_settings().get('cluster'):
+        if json_output_enabled():
+            raise click.UsageError("No default cluster set, pick one with: ecs cluster switch")
+
+        cluster_ids = get_cluster_ids()
         clusters_info = get_clusters_info(cluster_ids)
 
         print_msg_success("No default cluster set, please pick one: ")
@@ -78,9 +157,9 @@ def get_default_cluster():
         cluster = prompt('Cluster: ', validator=ChoicesValidator(choices=cluster_names),
                       completer=ChoicesCompleter(choices=cluster_names))
 
-        settings.setsave('cluster', cluster)
+        get_settings().setsave('cluster', cluster)
 
-    cluster = settings.get('cluster')
+    cluster = get_settings().get('cluster')
 
     print_msg_success("Cluster: {}".format(cluster))
 
@@ -88,42 +167,54 @@ def get_default_cluster():
 
 def get_cluster_arn(name):
 
-    clusters = ecs.list_clusters()['clusterArns']
-
-    cluster = [c for c in clusters if c.endswith("/{}".format(name))]
+    # Missing clusters come back under 'failures' (and recently deleted ones as INACTIVE).
+    # Not cached, so a cluster that was just created is found
+    clusters = [c for c in ecs.describe_clusters(clusters=[name])['clusters'] if c['status'] == 'ACTIVE']
 
-    if cluster:
-        return cluster[0]
+    if clusters:
+        return clusters[0]['clusterArn']
 
     return None
 
 
 
+def format_instance(i):
+    tags = {t['Key']: t['Value'] for t in i.get('Tags') or ()}
+
+    return {
+        'PrivateIpAddress': i['PrivateIpAddress'],
+        'Name': tags.get('Name'),
+        'Tags': tags,
+        'ImageId': i['ImageId'],
+        'InstanceType': i['InstanceType'],
+        'InstanceId': i['InstanceId'],
+        'State': i['State']['Name'],
+        'AvailabilityZone': i['Placement']['AvailabilityZone'],
+        'LaunchTime': i['LaunchTime']
+    }
+
 def format_instances(reservations):
+    return [format_instance(i) for r in reservations for i in r['Instances']]
 
-    results = []
+def get_ec2_instances_by_ids(ids):
+    return list(get_ec2_instances_dict_by_ids(frozenset(ids)).values())
 
-    for r in reservations:
-        for i in r['Instances']:
-            name = [t for t in i.get('Tags', []) if t['Key'] == 'Name']
-            name = name[0]['Value'] if name else None
-
-            results.append({
-                'PrivateIpAddress': i['PrivateIpAddress'],
-                'Name': name,
-                'ImageId': i['ImageId'],
-                'InstanceType': i['InstanceType'],
-                'InstanceId': i['InstanceId'],
-                'State': i['State']['Name'],
-                'AvailabilityZone': i['Placement']['AvailabilityZone'],
-                'LaunchTime': i['LaunchTime']
-            })
 
-    return results
+@functools.lru_cache(maxsize=None)
+def get_ec2_instances_dict_by_ids(ids):
+    """
+    InstanceId -> formatted instance, for a frozenset of ids.
+    """
+    # Cached so a command fetching the same container instances more than once only describes them once.
+    # Keep each describe_instances well under its per call limit, and fan the chunks out
+    reservations = parallel_map(lambda c: ec2.describe_instances(InstanceIds=list(c))['Reservations'],
+                                chunks(sorted(ids), 100), max_workers=8)
+
+    return {i['InstanceId']: format_instance(i) for r in chain.from_iterable(reservations) for i in r['Instances']}
 
-def get_ec2_instances_by_ids(ids):
-    reservations = ec2.describe_instances(InstanceIds=ids)['Reservations']
-    return format_instances(reservations)
+
+# Coalesces EC2 lookups made concurrently (eg per container instance chunk) into shared describe_instances calls
+ec2_instance_batcher = Batcher(lambda ids: get_ec2_instances_dict_by_ids(frozenset(ids)), max_items=1000)
 
 
 def get_ec2_instances():
@@ -134,9 +225,14 @@ def get_ec2_instances():
 
 
 def print_ec2_instances(instances):
+    if json_output_enabled():
+        return print_json('ec2_instances', list(instances))
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+
     header = ['Name', 'AvailabilityZone', 'PrivateIpAddress', 'ImageId', 'InstanceType', 'InstanceId', 'State', 'Age']
 
-    data = [[
+    data = ([
         i['Name'] if i['Name'] else '',
         i['AvailabilityZone'],
         i['PrivateIpAddress'],
@@ -144,29 +240,52 @@ def print_ec2_instances(instances):
         i['InstanceType'],
         i['InstanceId'],
         i['State'],
-        humanize.naturaltime(datetime.datetime.now(datetime.timezone.utc) - i['LaunchTime']),
-    ] for i in instances]
+        naturaltime(now - i['LaunchTime']),
+    ] for i in instances)
 
     data = sorted(data,key=lambda x:x[0])
 
     print_table(header, data)
 
+@functools.lru_cache(maxsize=None)
+def get_container_instance_batcher(cluster):
+    # describe_container_instances takes at most 100 instances per call
+    return Batcher(lambda arns: {i['containerInstanceArn']: i for i in ecs.describe_container_instances(
+        containerInstances=arns, cluster=cluster)['containerInstances']}, max_items=100)
+
 def get_container_instances_by_ids(ids, cluster, include_ec2_instance_detail=True):
 
-    if not ids:
+    # ids can be any iterable (eg streamed from a paginator)
+    batcher = get_container_instance_batcher(cluster)
+    futures = [batcher.submit(i) for i in ids]
+
+    if not futures:
         return []
 
-    instances = ecs.describe_container_instances(containerInstances=ids, cluster=cluster)[
-        'containerInstances']
+    ec2_futures = {}
+
+    if include_ec2_instance_detail:
+        # Look up EC2 detail as each batch of container instances comes back, rather than after all of them
+        for f in as_completed(futures):
+            if f.result():
+                ec2_futures[f] = ec2_instance_batcher.submit(f.result()['ec2InstanceId'])
+
+    # instances ECS couldn't describe (eg deregistered since being listed) are skipped
+    futures = [f for f in futures if f.result()]
+    instances = [f.result() for f in futures]
 
     # flatten results for tabular display
     results = []
 
+    # only collect the attributes/resources we display, ECS reports many more
+    wanted_attributes = {'ecs.ami-id', 'ecs.instance-type', 'ecs.availability-zone'}
+    wanted_resources = {'CPU', 'MEMORY'}
+
     for i in instances:
-        attributes = {a['name']: a.get('value', '') for a in i['attributes']}
+        attributes = {a['name']: a.get('value', '') for a in i['attributes'] if a['name'] in wanted_attributes}
 
-        registered_resources = {a['name']: a for a in i['registeredResources']}
-        remaining_resources = {a['name']: a for a in i['remainingResources']}
+        registered_resources = {a['name']: a.get('integerValue') for a in i['registeredResources'] if a['name'] in wanted_resources}
+        remaining_resources = {a['name']: a.get('integerValue') for a in i['remainingResources'] if a['name'] in wanted_resources}
 
         results.append({
             'cluster': cluster,
@@ -180,27 +299,26 @@ def get_container_instances_by_ids(ids, cluster, include_ec2_instance_detail=Tru
             'ecs.ami-id': attributes.get('ecs.ami-id', ''),
             'ecs.instance-type': attributes.get('ecs.instance-type', ''),
             'ecs.availability-zone': attributes.get('ecs.availability-zone', ''),
-            'registered.CPU': registered_resources.get('CPU', {}).get('integerValue'),
-            'registered.MEMORY': registered_resources.get('MEMORY', {}).get('integerValue'),
-            'remaining.CPU': remaining_resources.get('CPU', {}).get('integerValue'),
-            'remaining.MEMORY': remaining_resources.get('MEMORY', {}).get('integerValue'),
+            'registered.CPU': registered_resources.get('CPU'),
+            'registered.MEMORY': registered_resources.get('MEMORY'),
+            'remaining.CPU': remaining_resources.get('CPU'),
+            'remaining.MEMORY': remaining_resources.get('MEMORY'),
 
         })
 
     if include_ec2_instance_detail:
-        ec2_instance_ids = [i['ec2InstanceId'] for i in results]
-
-        instances = {x['InstanceId'] : x for x in get_ec2_instances_by_ids(ec2_instance_ids)}
-
-        for x in results:
-            x['ec2Detail'] = instances[x['ec2InstanceId']]
+        for x, f in zip(results, futures):
+            x['ec2Detail'] = ec2_futures[f].result()
 
     return results
 
 
 def get_container_instances_by_cluster_name(cluster, include_ec2_instance_detail=True):
 
-    instances_ids = ecs.list_container_instances(cluster=cluster)['containerInstanceArns']
+    # Streamed into the describe batcher, so instances are described while later pages are still being listed
+    pages = ecs.get_paginator('list_container_instances').paginate(cluster=cluster, PaginationConfig={'PageSize': 100})
+
+    instances_ids = (arn for page in pages for arn in page['containerInstanceArns'])
 
     results = get_container_instances_by_ids(instances_ids, cluster, include_ec2_instance_detail=include_ec2_instance_detail)
 
@@ -208,15 +326,18 @@ def get_container_instances_by_cluster_name(cluster, include_ec2_instance_detail
 
 
 def print_container_instances(instances):
+    if json_output_enabled():
+        return print_json('container_instances', list(instances))
+
     header = ['Cluster', 'ContainerInstance', 'Ec2InstanceId', 'Name', 'Private IP', 'State', 'AmiId', 'Type', 'Zone', 'Status', 'Tasks', 'Pending', 'CPU', 'Mem']
 
-    data = [[
+    data = ([
         i['cluster'],
-        i['containerInstanceArn'].split(':container-instance/')[1],
+        arn_id(i['containerInstanceArn']),
         i['ec2InstanceId'],
-        i['ec2Detail']['Name'],
-        i['ec2Detail']['PrivateIpAddress'],
-        i['ec2Detail']['State'],
+        i['ec2Detail']['Name'] if i['ec2Detail'] else "NA",
+        i['ec2Detail']['PrivateIpAddress'] if i['ec2Detail'] else "NA",
+        i['ec2Detail']['State'] if i['ec2Detail'] else "NA",
         i['ecs.ami-id'],
         i['ecs.instance-type'],
         i['ecs.availability-zone'],
@@ -225,29 +346,55 @@ def print_container_instances(instances):
         i['pendingTasksCount'],
         "{}/{}".format((i['registered.CPU'] - i['remaining.CPU']), i['registered.CPU']),
         "{}/{}".format((i['registered.MEMORY'] - i['remaining.MEMORY']), i['registered.MEMORY']),
-    ] for i in instances]
+    ] for i in instances)
 
     print_table(header, data)
 
 
+def get_container_repo_images_async(names, pagination_config):
+    # only used when aioboto3 is installed
+    import asyncio
+    import aioboto3
+
+    async def get_images(client, semaphore, name):
+        async with semaphore:
+            paginator = client.get_paginator('describe_images')
+            return [i async for page in paginator.paginate(repositoryName=name, PaginationConfig=pagination_config)
+                    for i in page['imageDetails']]
+
+    async def get_all_images():
+        # same cap on concurrent calls as the thread pool path
+        semaphore = asyncio.Semaphore(MAX_WORKERS)
+
+        async with aioboto3.Session(region_name=get_default_region()).client('ecr', config=get_boto_config()) as client:
+            return await asyncio.gather(*[get_images(client, semaphore, n) for n in names])
+
+    return asyncio.run(get_all_images())
+
+
 def get_container_repos():
 
-    maxResults = 100
+    pagination_config = {'PageSize': 1000}
 
-    repos = ecr.describe_repositories(maxResults=maxResults)['repositories']
+    repos = ecr.get_paginator('describe_repositories').paginate(
+        PaginationConfig=pagination_config).build_full_result()['repositories']
 
     repos = [{'name' : r['repositoryName']} for r in repos]
 
-    for r in repos:
+    def get_images(repo):
+        return ecr.get_paginator('describe_images').paginate(
+            repositoryName=repo['name'], PaginationConfig=pagination_config).build_full_result()['imageDetails']
 
-        images = ecr.describe_images(repositoryName=r['name'], maxResults=100)
-
-        if 'nextToken' in images:
-            log.warning("Found 100+ images for {}. Consider pruning unused tags!".format(r['name']))
+    # describe_images is one round-trip per repo (page), overlap them. Use asyncio if aioboto3 is
+    # installed, otherwise a thread pool (boto3 clients are thread safe)
+    if importlib.util.find_spec('aioboto3'):
+        results = get_container_repo_images_async([r['name'] for r in repos], pagination_config)
+    else:
+        results = parallel_map(get_images, repos)
 
-        images = images['imageDetails']
+    for r, images in zip(repos, results):
 
-        r['total'] = len(images) if len(images) < maxResults else "100+"
+        r['total'] = len(images)
         r['total_untagged'] = len([x for x in images if 'imageTags' not in x])
         r['images'] = [{'tags': i.get('imageTags',[]), 'digest': i['imageDigest'], 'size': i['imageSizeInBytes'],
                         'count': len(images),
@@ -257,73 +404,97 @@ def get_container_repos():
 
 
 def print_container_repos(repos):
+    if json_output_enabled():
+        return print_json('repos', repos)
+
+    now = datetime.datetime.now(datetime.timezone.utc)
 
     header = ['Name', 'Latest', 'Recent Tags', 'Image Count', 'Untagged Count']
 
-    def format_latest_image(images):
-        latest = sorted([i for i in images if 'latest' in i['tags']], key=lambda x:x['date'])
+    by_date = itemgetter('date')
+
+    def latest_and_recent_tagged_images(images):
+        # one pass to bucket the images, then only the newest of each are kept
+        latest, tagged = [], []
 
-        return "({}) {}".format(latest[0]['digest'].split("sha256:")[-1][0:8], humanize.naturaltime(datetime.datetime.now(datetime.timezone.utc) - latest[0]['date']).rjust(16)) if latest else ""
+        for i in images:
+            if 'latest' in i['tags']:
+                latest.append(i)
+            elif i['tags']:
+                tagged.append(i)
 
-    def format_recent_tag_images(images):
-        tagged = sorted([i for i in images if 'latest' not in i['tags'] and i['tags']], key=lambda x: x['date'])[0:3]
+        return max(latest, key=by_date, default=None), heapq.nlargest(3, tagged, key=by_date)
 
+    def format_latest_image(latest):
+        return "({}) {}".format(latest['digest'].rpartition("sha256:")[2][0:8], naturaltime(now - latest['date']).rjust(16)) if latest else ""
+
+    def format_recent_tag_images(tagged):
         if not tagged:
             return ""
 
-        tagged = ["({}) [{}] {}".format(t['digest'].split("sha256:")[-1][0:8], ",".join(t['tags']), humanize.naturaltime(datetime.datetime.now(datetime.timezone.utc) - t['date'])) for t in tagged]
+        tagged = ["({}) [{}] {}".format(t['digest'].rpartition("sha256:")[2][0:8], ",".join(t['tags']), naturaltime(now - t['date'])) for t in tagged]
 
         return ", ".join(tagged)
 
-    data = [[
-        r['name'],
-        format_latest_image(r['images']),
-        format_recent_tag_images(r['images']),
-        r['total'],
-        r['total_untagged']
-    ] for r in repos]
+    data = []
+
+    for r in repos:
+        latest, tagged = latest_and_recent_tagged_images(r['images'])
+
+        data.append([
+            r['name'],
+            format_latest_image(latest),
+            format_recent_tag_images(tagged),
+            r['total'],
+            r['total_untagged']
+        ])
 
     print_table(header, data)
 
 
 def get_services_by_cluster_name(cluster):
 
-    service_ids = ecs.list_services(cluster=cluster, maxResults=100)['serviceArns']
-    service_ids = [s.split(':service/')[-1] for s in service_ids]
-    if not service_ids:
-        return []
+    pages = ecs.get_paginator('list_services').paginate(cluster=cluster, PaginationConfig={'PageSize': 100})
 
-    results = []
+    def describe(service_ids):
+        return ecs.describe_services(services=list(service_ids), cluster=cluster)['services']
 
-    for c in chunks(service_ids, 10):
-        results += ecs.describe_services(services=c, cluster=cluster)['services']
+    # describe_services takes at most 10 services per call. Each page's chunks are described concurrently
+    # while the next page is still being listed.
+    with thread_pool(8) as ex:
+        futures = [ex.submit(describe, c) for page in pages for c in chunks([arn_id(s) for s in page['serviceArns']], 10)]
 
-    return results
+    return list(chain.from_iterable(f.result() for f in futures))
 
 def get_service_by_name(service, cluster):
 
     return ecs.describe_services(services=[service], cluster=cluster)['services'][0]
 
-def get_task_definitions(family_prefix):
-    return ecs.list_task_definitions(familyPrefix=family_prefix, status="ACTIVE", sort="DESC")['taskDefinitionArns']
+@ttl_cache_disk(ttl=60, key=cache_key)
+def get_task_definitions(family_prefix, max_results=5):
+    return ecs.list_task_definitions(familyPrefix=family_prefix, status="ACTIVE", sort="DESC", maxResults=max_results)['taskDefinitionArns']
 
 
 def print_task_events(events, max_rows=10):
-    header = ['Age', 'Message']
+    if json_output_enabled():
+        return print_json('events', events[0:max_rows])
+
+    now = datetime.datetime.now(datetime.timezone.utc)
 
-    def format_msg(msg):
-        if len(msg)> 100:
-            return msg[0:100] + "..."
-        return msg
+    header = ['Age', 'Message']
 
     data = [[
-        humanize.naturaltime(datetime.datetime.now(datetime.timezone.utc) - e['createdAt']),
-        format_msg(e['message']),
-    ] for e in events][0:max_rows]
+        naturaltime(now - e['createdAt']),
+        truncate(e['message'], 100),
+    ] for e in events[0:max_rows]]
 
     print_table(header, data)
 
 def print_tasks(tasks):
+    if json_output_enabled():
+        return print_json('tasks', list(tasks))
+
+    now = datetime.datetime.now(datetime.timezone.utc)
 
     header = ['Group', 'TaskDef', 'Ports', 'Name', 'IP', 'Zone', 'Instance', 'Connectivity', 'connectivityAt', 'memory', 'Desired', 'Health', 'Status']
 
@@ -336,66 +507,69 @@ def print_tasks(tasks):
 
         return " ".join(result)
 
-    data = []
-
-    for t in tasks:
-
-        item = [
-            t['group'],
-            t['taskDefinitionArn'].split(':task-definition/')[1],
-            format_container_ports(t['containers']),
-            t['container_instance']['ec2Detail']['Name'] if "container_instance" in t and t['container_instance'] else "NA",
-            t['container_instance']['ec2Detail']['PrivateIpAddress'] if "container_instance" in t and t['container_instance'] else "NA",
-            t['container_instance']['ecs.availability-zone'] if "container_instance" in t and t['container_instance'] else "NA",
-            t['container_instance']['ecs.instance-type'] if "container_instance" in t and t['container_instance'] else "NA",
-            t.get('connectivity', ''),
-            humanize.naturaltime(datetime.datetime.now(datetime.timezone.utc) - t['connectivityAt']) if 'connectivityAt' in t else "",
-            t['memory'],
-            t['desiredStatus'],
-            t['healthStatus'],
-            t['lastStatus'],
-        ]
+    def rows():
+        for t in tasks:
+            ci = t.get('container_instance')
+            ec2_detail = ci['ec2Detail'] if ci else None
+
+            yield [
+                t['group'],
+                arn_id(t['taskDefinitionArn']),
+                format_container_ports(t['containers']),
+                ec2_detail['Name'] if ec2_detail else "NA",
+                ec2_detail['PrivateIpAddress'] if ec2_detail else "NA",
+                ci['ecs.availability-zone'] if ci else "NA",
+                ci['ecs.instance-type'] if ci else "NA",
+                t.get('connectivity', ''),
+                naturaltime(now - t['connectivityAt']) if 'connectivityAt' in t else "",
+                t['memory'],
+                t['desiredStatus'],
+                t['healthStatus'],
+                t['lastStatus'],
+            ]
 
-        data.append(item)
+    data = rows()
 
     print_table(header, data)
 
 
 def print_services(services):
+    if json_output_enabled():
+        return print_json('services', list(services))
+
+    now = datetime.datetime.now(datetime.timezone.utc)
 
     header = ['Service Name', 'Task Def', 'Launch Type/CPs', 'Desired', 'Running', 'Pending', 'Status', 'Created', 'Deployments (des/pend/run)']
 
     def format_deployments(deployments):
 
-        result = []
-        for d in deployments:
-            updated_at = humanize.naturaltime(datetime.datetime.now(datetime.timezone.utc) - d['updatedAt'])
-            result.append("{}/{}/{} {}".format(d['desiredCount'], d['pendingCount'], d['runningCount'], updated_at))
-        msg =  " ".join(result)
-        if len(msg)> 80:
-            return msg[0:80] + "..."
-        return msg
+        # generator so deployments past the 80 char cut off are never formatted
+        return join_truncated(("{}/{}/{} {}".format(d['desiredCount'], d['pendingCount'], d['runningCount'],
+                                                   naturaltime(now - d['updatedAt'])) for d in deployments), 80)
 
-    data = [[
+    data = ([
         s['serviceName'],
-        s['taskDefinition'].split(":task-definition/")[-1],
+        arn_id(s['taskDefinition']),
         s.get('launchType', " ".join(["{} ({})".format(x['capacityProvider'], x['weight']) for x in s.get("capacityProviderStrategy", [])])),
         s['desiredCount'],
         s['runningCount'],
         s['pendingCount'],
         s['status'],
-        humanize.naturaltime(datetime.datetime.now(datetime.timezone.utc) - s['createdAt']),
+        naturaltime(now - s['createdAt']),
         format_deployments(s['deployments']),
-    ] for s in services]
+    ] for s in services)
 
     print_table(header, data)
 
 
 def print_task_def_list(task_def_ids):
+    if json_output_enabled():
+        return print_json('task_definitions', task_def_ids[0:5])
+
     header = ['Task Def']
 
     data = [[
-       td.split(':task-definition/')[1]
+       arn_id(td)
     ] for td in task_def_ids[0:5]]
 
     print_table(header, data)
@@ -408,6 +582,8 @@ def assert200Response(response):
 def delete_service(cluster, service_name):
     response = ecs.delete_service(service=service_name, cluster=cluster)
 
+    clear_disk_cache()
+
     assert200Response(response)
 
     return True
@@ -419,7 +595,7 @@ def delete_schedule(name):
             Rule=name
         )
     except events.exceptions.ResourceNotFoundException:
-        print(fg('red') + "\n\t" + "Schedule not found" + reset)
+        print_msg_error("Schedule not found")
         return
 
     assert200Response(response)
@@ -555,12 +731,12 @@ def create_service(cluster, service_name,
         params["deploymentConfiguration"] = change_keys(deployment_configuration, convert=lowerCaseFirstLetter)
 
     if network_configuration:
-        aws_vpc_config = copy.copy(network_configuration['AwsvpcConfiguration'])
+        aws_vpc_config = network_configuration['AwsvpcConfiguration']
 
         params['networkConfiguration'] = {
             'awsvpcConfiguration' : {
-                'subnets': aws_vpc_config.pop("Subnets"),
-                'securityGroups': aws_vpc_config.pop("SecurityGroups")
+                'subnets': aws_vpc_config['Subnets'],
+                'securityGroups': aws_vpc_config['SecurityGroups']
             }
         }
 
@@ -570,6 +746,8 @@ def create_service(cluster, service_name,
 
     response = ecs.create_service(serviceName=service_name, cluster=cluster, **params)
 
+    clear_disk_cache()
+
     assert200Response(response)
 
 
@@ -591,6 +769,8 @@ def update_service(cluster, service_name, task_definition=None, scheduling_strat
 
     result = ecs.update_service(service=service_name, cluster=cluster, **params)
 
+    clear_disk_cache()
+
     status = result['ResponseMetadata']['HTTPStatusCode']
     if status != 200:
         raise Exception("Something went wrong: status={}".format(status))
@@ -600,14 +780,68 @@ def update_service(cluster, service_name, task_definition=None, scheduling_strat
 
 def get_task_ids_by_family_and_cluster(family, cluster):
 
-    return ecs.list_tasks(family=family, cluster=cluster)['taskArns']
+    return ecs.get_paginator('list_tasks').paginate(family=family, cluster=cluster).build_full_result()['taskArns']
+
+def get_tasks_with_container_instances(ids, cluster):
+    """
+    Describe tasks along with the container instances (and their EC2 detail) they run on. Container instances
+    are fetched as soon as each describe_tasks chunk returns rather than once all of them have.
+    """
+    with thread_pool(8) as ex:
+        task_futures = [ex.submit(ecs.describe_tasks, tasks=list(c), cluster=cluster) for c in chunks(ids, 100)]
+
+        seen = set()
+        container_instance_futures = []
+
+        for f in as_completed(task_futures):
+            arns = {t['containerInstanceArn'] for t in f.result()['tasks'] if 'containerInstanceArn' in t} - seen
+            if arns:
+                seen |= arns
+                container_instance_futures.append(ex.submit(get_container_instances_by_ids, list(arns), cluster))
 
-def get_tasks_by_ids_and_cluster(ids, cluster):
-    return ecs.describe_tasks(tasks=ids, cluster=cluster)['tasks']
+        wait(container_instance_futures)
+
+    tasks = list(chain.from_iterable(f.result()['tasks'] for f in task_futures))
+
+    container_instances_dict = {c['containerInstanceArn']: c for f in container_instance_futures for c in f.result()}
+
+    for t in tasks:
+        t['container_instance'] = container_instances_dict.get(t.get('containerInstanceArn'))
+
+    return tasks
 
 @click.group()
-def main():
-    pass
+@click.option('--no-cache', is_flag=True, help="Don't use cached cluster/task definition info")
+@click.option('--pretty', is_flag=True, help="Render tables with terminaltables (handles wide/colored cells)")
+@click.option('--json', 'as_json', is_flag=True, help="Print the raw results as a single JSON document instead of tables")
+@click.pass_context
+def main(ctx, no_cache, pretty, as_json):
+    if no_cache:
+        set_disk_cache_enabled(False)
+
+    if pretty:
+        set_pretty_tables(True)
+
+    if as_json:
+        set_json_output(True)
+
+        ctx.call_on_close(close_json_output)
+
+
+def close_json_output():
+    # called as the command's context closes, don't write a partial document if the command failed
+    e = sys.exc_info()[1]
+
+    # click < 8.2 closes the context while exiting with Exit(0) (SystemExit(0) before click 7) after a successful command
+    if isinstance(e, getattr(click.exceptions, 'Exit', ())):
+        succeeded = e.exit_code == 0
+    elif isinstance(e, SystemExit):
+        succeeded = e.code in (0, None)
+    else:
+        succeeded = e is None
+
+    if succeeded:
+        write_json_output()
 
 
 @main.group(name='cluster')
@@ -620,7 +854,7 @@ def cmd_cluster():
 @cmd_cluster.command(name='ls')
 def cmd_cluster_ls():
     """Display Clusters Info"""
-    cluster_ids = get_cluster_ids(ecs)
+    cluster_ids = get_cluster_ids()
     clusters_info = get_clusters_info(cluster_ids)
 
     print_clusters_info(clusters_info)
@@ -632,14 +866,10 @@ def cmd_switch_cluster(n):
 
     cluster_name = None
 
-    if n:
-        cluster_ids = get_cluster_ids(ecs)
-        clusters_info = get_clusters_info(cluster_ids)
-        cluster_names = [c['clusterName'] for c in clusters_info]
-        if n in cluster_names:
-            cluster_name = n
+    if n and get_cluster_arn(n):
+        cluster_name = n
 
-    settings.setsave('cluster', cluster_name)
+    get_settings().setsave('cluster', cluster_name)
 
     get_default_cluster()
 
@@ -660,25 +890,27 @@ def cmd_drain_container_instances(name):
 
     cluster = get_default_cluster()
 
-    # todo: get only the instance we require
-    instances = get_container_instances_by_cluster_name(cluster)
+    # EC2 detail is only needed for the instance we drain, don't describe the whole cluster
+    instances = get_container_instances_by_cluster_name(cluster, include_ec2_instance_detail=False)
 
     instance = [i for i in instances if i['ec2InstanceId'] == name]
 
     if not instance:
-        print("Not found!")
+        print_msg_error("Not found!")
         return
 
     instance = instance[0]
 
-    print(fg('green') + "\n\tSetting {} ({}) to DRAIN".format(instance['ec2Detail']['Name'], name) + reset)
+    ec2_detail = get_ec2_instances_by_ids([name])[0]
+
+    print_msg_success("Setting {} ({}) to DRAIN".format(ec2_detail['Name'], name))
 
     container_instance_arn = instance['containerInstanceArn']
 
     result = ecs.update_container_instances_state(cluster=cluster, containerInstances=[container_instance_arn], status='DRAINING')
 
     if result['failures']:
-        pprint.pprint(result['failures'])
+        print_msg_error(pprint.pformat(result['failures']))
         raise
 
 
@@ -728,10 +960,10 @@ def cmd_task_register(name):
 
     service_def = get_service_def_from_file(name, cluster)
     task_arn = register_task_def(service_def['TaskDefinition'])
-    rev = task_arn.split(":")[-1]
+    rev = task_arn.rpartition(":")[2]
 
 
-    print(fg('green') + "\n\t{} now at revision {}".format(name, rev) + reset)
+    print_msg_success("{} now at revision {}".format(name, rev))
 
 @cmd_task.command(name='ls')
 def cmd_task_ls():
@@ -753,16 +985,16 @@ def cmd_task_start(taskdefinition, containerinstance):
     result = ecs.start_task(cluster=cluster, taskDefinition=taskdefinition, containerInstances=[containerinstance])
 
     if result['ResponseMetadata']['HTTPStatusCode'] != 200:
-        print(result['ResponseMetadata'])
+        print_msg_error(str(result['ResponseMetadata']))
         return
 
     if result['failures']:
-        print(result['failures'])
+        print_msg_error(str(result['failures']))
         return
 
     task = result['tasks'][0]
 
-    print(fg('green') + "\n\tStarted {} task {}".format(taskdefinition, task['taskArn'].split(':task/')[1]) + reset)
+    print_msg_success("Started {} task {}".format(taskdefinition, arn_id(task['taskArn'])))
 
 @cmd_task.command(name='stop')
 @click.argument('task')
@@ -774,13 +1006,50 @@ def cmd_task_stop(task):
     result = ecs.stop_task(cluster=cluster, task=task)
 
     if result['ResponseMetadata']['HTTPStatusCode'] != 200:
-        print(result['ResponseMetadata'])
+        print_msg_error(str(result['ResponseMetadata']))
         return
 
-    print(fg('green') + "\n\tStoped task {}".format(task) + reset)
+    print_msg_success("Stoped task {}".format(task))
 
+@functools.lru_cache(maxsize=1)
 def get_default_region():
-    return boto3.session.Session().region_name
+    return get_session().region_name
+
+def load_yaml(stream):
+    import yaml
+
+    # libyaml's C parser when available
+    return yaml.load(stream, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+
+@functools.lru_cache(maxsize=1)
+def get_jinja_env():
+    from jinja2 import Environment
+
+    return Environment()
+
+@functools.lru_cache(maxsize=None)
+def get_template(source):
+    return get_jinja_env().from_string(source)
+
+def get_shared_config(path):
+
+    if not os.path.exists(path):
+        return {
+            'Properties': {},
+            'LogConfiguration': {
+
+            }
+
+        }
+
+    # keyed on mtime so an edited file is re-read
+    return load_shared_config(path, os.stat(path).st_mtime_ns)
+
+@functools.lru_cache(maxsize=None)
+def load_shared_config(path, mtime):
+    # one read, the parser then works on the whole string rather than pulling from the file
+    with open(path, 'r') as f:
+        return load_yaml(f.read())
 
 def get_service_def_from_file(name, cluster_name):
 
@@ -788,19 +1057,21 @@ def get_service_def_from_file(name, cluster_name):
 
     shared_config_path = "./services/{}.yaml".format(cluster_name)
 
-    shared_config = {
-        'Properties': {},
-        'LogConfiguration': {
+    shared_mtime = os.stat(shared_config_path).st_mtime_ns if os.path.exists(shared_config_path) else None
 
-        }
+    # keyed on mtimes so an edited file is re-built, copied as callers are free to modify the result
+    return copy.deepcopy(load_service_def(file_path, shared_config_path, cluster_name,
+                                          os.stat(file_path).st_mtime_ns, shared_mtime))
 
-    }
+@functools.lru_cache(maxsize=None)
+def load_service_def(file_path, shared_config_path, cluster_name, mtime, shared_mtime):
 
-    if os.path.exists(shared_config_path):
-        with open(shared_config_path, 'r') as f:
-            shared_config = yaml.load(f, Loader=yaml.SafeLoader)
+    # shared config is cached, don't modify it
+    shared_config = get_shared_config(shared_config_path)
 
-    shared_config['Properties'].update(
+    properties = dict(shared_config['Properties'])
+
+    properties.update(
         {
             'CLUSTER_NAME': cluster_name,
             'REGION': get_default_region()
@@ -810,11 +1081,11 @@ def get_service_def_from_file(name, cluster_name):
     with open(file_path, 'r') as f:
         service_def = f.read()
 
-        template = Template(service_def)
+        template = get_template(service_def)
 
-        service_def = template.render(shared_config['Properties'])
+        service_def = template.render(properties)
 
-        service_def = yaml.load(service_def, Loader=yaml.SafeLoader)
+        service_def = load_yaml(service_def)
 
     task_def =  service_def['TaskDefinition']
 
@@ -827,11 +1098,11 @@ def get_service_def_from_file(name, cluster_name):
 
     log_config = json.dumps(log_config)
 
-    template = Template(log_config)
+    template = get_template(log_config)
 
-    shared_config['Properties'].update({'FAMILY': task_def['family']})
+    properties.update({'FAMILY': task_def['family']})
 
-    log_config = template.render(shared_config['Properties'])
+    log_config = template.render(properties)
 
     log_config = json.loads(log_config)
 
@@ -844,29 +1115,28 @@ def get_service_def_from_file(name, cluster_name):
     return service_def
 
 def create_log_group(name):
-    result = logs.describe_log_groups(logGroupNamePrefix=name)['logGroups']
-
-    for lg in result:
-        if lg['logGroupName'] == name:
-            return
+    try:
+        logs.create_log_group(logGroupName=name)
+    except logs.exceptions.ResourceAlreadyExistsException:
+        return
 
-    logs.create_log_group(logGroupName=name)
-    print(fg('green') + "\n\tCreated log group {}".format(name) + reset)
+    print_msg_success("Created log group {}".format(name))
 
 
 def register_task_def(task_def):
 
     # Ensure log group exists (or will fail and be hard to diagnose)
-    log_groups = list(set([c['logConfiguration']['options']['awslogs-group'] for c in task_def['containerDefinitions']
-                           if c.get('logConfiguration', {}).get('logDriver') == 'awslogs']))
+    log_groups = {c['logConfiguration']['options']['awslogs-group'] for c in task_def['containerDefinitions']
+                  if c.get('logConfiguration', {}).get('logDriver') == 'awslogs'}
 
-    for lg in log_groups:
-        create_log_group(lg)
+    parallel_map(create_log_group, log_groups, max_workers=8)
 
     result = ecs.register_task_definition(**task_def)
 
+    clear_disk_cache()
+
     if result['ResponseMetadata']['HTTPStatusCode'] != 200:
-        print(result['ResponseMetadata'])
+        print_msg_error(str(result['ResponseMetadata']))
         raise Exception()
 
     return result['taskDefinition']['taskDefinitionArn']
@@ -881,20 +1151,23 @@ def get_task_definitions_by_service():
 
     results = []
     for key, value in groupby(iterable=tasks['taskDefinitionArns'],
-                              key=lambda x: x.split("/")[-1].split(":")[0]):
+                              key=lambda x: arn_id(x).partition(":")[0]):
         items = list(value)
         results.append(
             {
                 'name': key,
                 'total': len(items),
-                'first': items[0].split(":")[-1],
-                'last': items[-1].split(":")[-1],
+                'first': items[0].rpartition(":")[2],
+                'last': items[-1].rpartition(":")[2],
             }
         )
 
     return results
 
 def print_task_definitions_by_service(task_definitions):
+    if json_output_enabled():
+        return print_json('task_definitions_by_service', task_definitions)
+
     header = ['Service', 'Earliest', 'Oldest', 'Total']
 
     data = [[
@@ -920,7 +1193,7 @@ def cmd_repos():
 def cmd_list_repos():
     """List Repos"""
 
-    print(fg('green') + "\n\tRegion: {}".format(boto3.session.Session().region_name) + reset)
+    print_msg_success("Region: {}".format(get_default_region()))
 
     repos = get_container_repos()
     print_container_repos(repos)
@@ -934,9 +1207,9 @@ def cmd_create_repo(name):
     result = ecr.create_repository(repositoryName=name)
 
     if result['ResponseMetadata']['HTTPStatusCode'] == 200:
-        print(fg('green') + "\n\tCreated {}".format(result['repository']['repositoryUri']) + reset)
+        print_msg_success("Created {}".format(result['repository']['repositoryUri']))
     else:
-        pprint.pprint(result)
+        print_msg_error(pprint.pformat(result))
 
 @cmd_repos.command(name='delete')
 @click.argument('name')
@@ -948,13 +1221,13 @@ def cmd_delete_repo(name, force):
         result = ecr.delete_repository(repositoryName=name, force=force)
 
         if result['ResponseMetadata']['HTTPStatusCode'] == 200:
-            print(fg('green') + "\n\tDeleted OK" + reset)
+            print_msg_success("Deleted OK")
 
     except Exception as e:
         if "cannot be deleted because it still contains images" in str(e):
-            print(fg('red') + "\n\t" + "Repo {} contains images. use --force flag".format(name) + reset)
+            print_msg_error("Repo {} contains images. use --force flag".format(name))
         else:
-            print(fg('red') + "\n\t" + str(e) + reset)
+            print_msg_error(str(e))
 
 
 @cmd_repos.command(name='prune')
@@ -969,10 +1242,10 @@ def cmd_prune_repo(name):
             result = ecr.batch_delete_image(repositoryName=name, imageIds=imageIds['imageIds'])
 
             if result['ResponseMetadata']['HTTPStatusCode'] == 200:
-                print(fg('green') + "\n\tPruned {} images".format(len(imageIds['imageIds'])) + reset)
+                print_msg_success("Pruned {} images".format(len(imageIds['imageIds'])))
 
     except Exception as e:
-        print(fg('red') + "\n\t" + str(e) + reset)
+        print_msg_error(str(e))
 
 
 @main.group(name='service')
@@ -1000,34 +1273,32 @@ def cmd_list_tasks(service):
 
     cluster = get_default_cluster()
 
-    service_info = get_service_by_name(service, cluster)
+    def get_tasks():
+        task_ids = get_task_ids_by_family_and_cluster(family=service, cluster=cluster)
 
-    print_services([service_info])
+        return get_tasks_with_container_instances(task_ids, cluster) if task_ids else []
 
-    task_def_list = get_task_definitions(family_prefix=service)
+    # The service, task definitions and tasks are independent, fetch them concurrently and print in order
+    with thread_pool(3) as executor:
+        service_future = executor.submit(get_service_by_name, service, cluster)
+        task_def_list_future = executor.submit(get_task_definitions, family_prefix=service, max_results=5)
+        tasks_future = executor.submit(get_tasks)
 
-    print_task_def_list(task_def_list)
+        service_info = service_future.result()
 
-    events = service_info['events']
+        print_services([service_info])
 
-    print_task_events(events)
+        print_task_def_list(task_def_list_future.result())
 
-    task_ids = get_task_ids_by_family_and_cluster(family=service, cluster=cluster)
+        events = service_info['events']
 
-    if task_ids:
-        tasks = get_tasks_by_ids_and_cluster(task_ids, cluster)
+        print_task_events(events)
 
-        container_instance_ids = [t['containerInstanceArn'] for t in tasks if 'containerInstanceArn' in t]
+        tasks = tasks_future.result()
 
-        if container_instance_ids:
-            results = get_container_instances_by_ids(ids=container_instance_ids, cluster=cluster)
-
-            container_instances_dict = {c['containerInstanceArn']:c for c in results}
-
-            for t in tasks:
-                t['container_instance'] = container_instances_dict.get(t.get('containerInstanceArn'))
-
-        print_tasks(tasks)
+        # always present in the JSON document, even if empty
+        if tasks or json_output_enabled():
+            print_tasks(tasks)
 
 
 @cmd_service.command(name='scale')
@@ -1038,7 +1309,7 @@ def cmd_scale(name, desired):
 
     cluster = get_default_cluster()
 
-    print(fg('green') + "\n\tScaling {} to {}".format(name, desired) + reset)
+    print_msg_success("Scaling {} to {}".format(name, desired))
 
     update_service(desired_count=desired, cluster=cluster, service_name=name)
 
@@ -1050,7 +1321,7 @@ def cmd_redeploy(name):
 
     cluster = get_default_cluster()
 
-    print(fg('green') + "\n\tRedeploying " + name + reset)
+    print_msg_success("Redeploying " + name)
 
     update_service(force_new_deployment=True, cluster=cluster, service_name=name)
 
@@ -1067,7 +1338,7 @@ def cmd_create_service(name, desired):
 
     task_arn = register_task_def(service_def['TaskDefinition'])
 
-    rev = task_arn.split(":")[-1]
+    rev = task_arn.rpartition(":")[2]
 
     scheduling_strategy = "REPLICA"
     if "SchedulingStrategy" in service_def:
@@ -1099,7 +1370,7 @@ def cmd_create_service(name, desired):
 
     network_configuration = service_def.get("NetworkConfiguration", None)
 
-    print(fg('green') + "\n\tCreating Service {} (Desired={}) with revision {}".format(name, desired, rev) + reset)
+    print_msg_success("Creating Service {} (Desired={}) with revision {}".format(name, desired, rev))
 
     create_service(task_definition="{}:{}".format(name, rev) if rev else name,
                    placement_strategy=placement_strategy,
@@ -1127,7 +1398,7 @@ def cmd_create_service(name, desired):
 
         network_configuration = service_def.get("NetworkConfiguration", None)
 
-        print(fg('green') + "\n\tCreating Schedule {} ({}) with revision {}".format(schedule_name, fixed_interval if fixed_interval else cron_expression, rev) + reset)
+        print_msg_success("Creating Schedule {} ({}) with revision {}".format(schedule_name, fixed_interval if fixed_interval else cron_expression, rev))
 
         create_schedule(
             name=schedule_name,
@@ -1155,7 +1426,7 @@ def cmd_update_service(name, rev, desired):
     if not rev:
         service_def = get_service_def_from_file(name, cluster)
         task_arn = register_task_def(service_def['TaskDefinition'])
-        rev = task_arn.split(":")[-1]
+        rev = task_arn.rpartition(":")[2]
 
         scheduling_strategy = "REPLICA"
         if "SchedulingStrategy" in service_def:
@@ -1168,7 +1439,7 @@ def cmd_update_service(name, rev, desired):
             enable_execute_command = service_def['EnableExecuteCommand']
 
     taskdef = "{}:{}".format(name, rev) if rev else name
-    print(fg('green') + "\n\tUpdating {} (Desired={}) using revision {}".format(name, desired, rev) + reset)
+    print_msg_success("Updating {} (Desired={}) using revision {}".format(name, desired, rev))
 
     update_service(task_definition=taskdef, cluster=cluster, scheduling_strategy=scheduling_strategy, desired_count=desired, enable_execute_command=enable_execute_command, service_name=name)
 
@@ -1181,6 +1452,9 @@ def cmd_describe_service(name):
 
     service_def = get_service_def_from_file(name, cluster)
 
+    if json_output_enabled():
+        return print_json('service_definition', service_def)
+
     pprint.pprint(service_def)
 
 
@@ -1188,10 +1462,11 @@ def cmd_describe_service(name):
 @click.argument('name')
 def cmd_delete(name):
     """Delete Service"""
+    from botocore.exceptions import ClientError
 
     cluster = get_default_cluster()
 
-    print(fg('red') + "\n\tDeleting {}".format(name) + reset)
+    print_msg_error("Deleting {}".format(name))
 
 
     # Scale down first
@@ -1,5 +1,18 @@
+import collections.abc
+import datetime
+import functools
+import hashlib
 import itertools
+import json
+import os
 import pprint
+import queue
+import re
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from colored import attr
 from prompt_toolkit.completion import Completer, Completion
 from prompt_toolkit.validation import Validator, ValidationError
@@ -25,37 +38,350 @@ class ChoicesCompleter(Completer):
             if c.lower().startswith(document.text.lower()):
                 yield Completion(c, start_position=-len(document.text))
 
+# task definitions repeat the same handful of keys, so only convert each one once
+@functools.lru_cache(maxsize=None)
 def lowerCaseFirstLetter(str):
     return str[0].lower() + str[1:]
 
-def change_keys(obj, convert, recursive=True, level=0):
+def arn_id(arn):
     """
-    Recursively goes through the dictionary obj and replaces keys with the convert function.
+    Resource id from the tail of an ARN, eg arn:aws:ecs:region:account:task-definition/my-app:12 -> my-app:12
     """
-    if isinstance(obj, (str, int, float)):
-        return obj
-    if isinstance(obj, dict) and (recursive or level == 0):
+    return arn.rpartition('/')[2]
+
+def change_keys(obj, convert, recursive=True):
+    """
+    Goes through the dictionary obj and replaces keys with the convert function (only the top level keys if not recursive).
+    Walks the structure with an explicit stack rather than recursing per node.
+    """
+    if not recursive:
+        if not isinstance(obj, dict):
+            return obj
         new = obj.__class__()
         for k, v in obj.items():
-            new[convert(k)] = change_keys(v, convert, recursive, level=level+1)
-    elif isinstance(obj, (list, set, tuple)) and recursive:
-        new = obj.__class__(change_keys(v, convert, recursive, level=level+1) for v in obj)
-    else:
+            new[convert(k)] = v
+        return new
+
+    containers = (dict, list, set, tuple)
+
+    if not isinstance(obj, containers):
         return obj
-    return new
+
+    root = [obj]
+    stack = [(obj, root, 0)]
+    # non list sequences are built as lists and converted once their children are filled in
+    finalize = []
+
+    # Only containers are pushed, scalar leaves (most nodes) are copied across in place.
+    # Exact type checks first as YAML only produces plain dicts and lists.
+    while stack:
+        node, parent, key = stack.pop()
+        cls = node.__class__
+
+        if cls is dict or (cls is not list and isinstance(node, dict)):
+            new = cls()
+            for k, v in node.items():
+                k = convert(k)
+                new[k] = v
+                if isinstance(v, containers):
+                    stack.append((v, new, k))
+        else:
+            new = list(node)
+            for i, v in enumerate(new):
+                if isinstance(v, containers):
+                    stack.append((v, new, i))
+            if cls is not list:
+                finalize.append((cls, new, parent, key))
+
+        parent[key] = new
+
+    # innermost first
+    for cls, new, parent, key in reversed(finalize):
+        parent[key] = cls(new)
+
+    return root[0]
 
 
 def chunks(iterable,size):
+    # sequences (the usual case, eg a list of ids) are sliced rather than pulled through an iterator
+    if isinstance(iterable, collections.abc.Sequence):
+        return (iterable[i:i + size] for i in range(0, len(iterable), size))
+
+    # itertools.batched is 3.12+
+    if hasattr(itertools, 'batched'):
+        return itertools.batched(iterable, size)
+
+    return _islice_chunks(iterable, size)
+
+def _islice_chunks(iterable,size):
     it = iter(iterable)
     chunk = tuple(itertools.islice(it,size))
     while chunk:
         yield chunk
         chunk = tuple(itertools.islice(it,size))
 
+def get_max_workers():
+    try:
+        return max(1, int(os.environ.get('YA_ECS_CTL_MAX_WORKERS') or 16))
+    except ValueError:
+        sys.stderr.write("Ignoring invalid YA_ECS_CTL_MAX_WORKERS, using 16\n")
+        return 16
+
+# Upper bound on threads used for a concurrent AWS fan out, lower it if hitting API rate limits
+MAX_WORKERS = get_max_workers()
+
+def thread_pool(max_workers=16):
+    """
+    ThreadPoolExecutor with max_workers capped by MAX_WORKERS.
+    """
+    return ThreadPoolExecutor(max_workers=max(1, min(max_workers, MAX_WORKERS)))
+
+def parallel_map(fn, iterable, max_workers=16):
+    """
+    Like map() but runs fn across a thread pool, for fanning out I/O bound (boto3) calls. Result order is preserved.
+    """
+    items = list(iterable)
+    if min(max_workers, MAX_WORKERS, len(items)) < 2:
+        return [fn(i) for i in items]
+
+    with thread_pool(min(max_workers, len(items))) as ex:
+        return list(ex.map(fn, items))
+
+class Batcher(object):
+    """
+    Coalesces single key lookups submitted from any thread into multi key API calls (after Karpenter's batcher).
+
+    fn is called with a list of unique keys and must return a dict of key -> result, keys it leaves out (eg reported
+    as failures) resolve to None. A batch is sent once it has max_items keys, max_delay seconds after its first key,
+    or when no new key arrives within idle_delay seconds. Batches are sent concurrently.
+    """
+
+    def __init__(self, fn, max_delay=0.3, idle_delay=0.02, max_items=100, max_workers=8):
+        self.fn = fn
+        self.max_delay = max_delay
+        self.idle_delay = idle_delay
+        self.max_items = max_items
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.worker = None
+        self.executor = thread_pool(max_workers)
+
+    def submit(self, key):
+        future = Future()
+
+        with self.lock:
+            self.queue.put((key, future))
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._run, daemon=True)
+                self.worker.start()
+
+        return future
+
+    def _run(self):
+        while True:
+            with self.lock:
+                if self.queue.empty():
+                    self.worker = None
+                    return
+
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.max_delay
+
+            while len(batch) < self.max_items:
+                timeout = min(self.idle_delay, deadline - time.monotonic())
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            self.executor.submit(self._send, batch)
+
+    def _send(self, batch):
+        try:
+            results = self.fn(list(dict.fromkeys(key for key, _ in batch)))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for key, future in batch:
+            future.set_result(results.get(key))
+
+
+def truncate(text, width):
+    if len(text) > width:
+        return text[0:width] + "..."
+    return text
+
+def join_truncated(parts, width, sep=" "):
+    """
+    sep.join(parts) truncated to width (plus "..."). Stops pulling from parts once past width.
+    """
+    taken = []
+    length = -len(sep)
+
+    for p in parts:
+        taken.append(p)
+        length += len(sep) + len(p)
+        if length > width:
+            break
+
+    return truncate(sep.join(taken), width)
+
+def naturaltime(delta):
+    """
+    humanize.naturaltime for a timedelta, memoised at one second resolution as table rows often share ages.
+    """
+    return _naturaltime(int(delta.total_seconds()))
+
+@functools.lru_cache(maxsize=1024)
+def _naturaltime(seconds):
+    import humanize
+
+    return humanize.naturaltime(datetime.timedelta(seconds=seconds))
+
+cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'ya-ecs-ctl')
+
+disk_cache_enabled = True
+
+def set_disk_cache_enabled(enabled):
+    global disk_cache_enabled
+    disk_cache_enabled = enabled
+
+def clear_disk_cache():
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+def ttl_cache_disk(ttl, key=None):
+    """
+    Read through cache of fn's (JSON serialisable) result under ~/.cache/ya-ecs-ctl, valid for ttl seconds.
+    Entries are keyed on the function name, its arguments and key() if given (eg region).
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not disk_cache_enabled:
+                return fn(*args, **kwargs)
+
+            cache_key = [fn.__name__, args, sorted(kwargs.items()), key() if key else None]
+            digest = hashlib.sha1(json.dumps(cache_key, default=str).encode()).hexdigest()
+            path = os.path.join(cache_dir, "{}-{}.json".format(fn.__name__, digest))
+
+            try:
+                if time.time() - os.path.getmtime(path) < ttl:
+                    with open(path, 'r') as f:
+                        return json.load(f)
+            except (OSError, ValueError):
+                pass
+
+            result = fn(*args, **kwargs)
+
+            # a failure to write the cache shouldn't fail the command
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                with open(path + ".tmp", 'w') as f:
+                    json.dump(result, f)
+                os.replace(path + ".tmp", path)
+            except (OSError, TypeError):
+                pass
+
+            return result
+
+        return wrapper
+
+    return decorator
+
+pretty_tables = False
+
+def set_pretty_tables(enabled):
+    global pretty_tables
+    pretty_tables = enabled
+
+ansi_escape = re.compile(r'\x1b\[[0-9;]*m')
+
+def visible_len(text):
+    # colour codes (eg from colored) take no space on screen
+    return len(ansi_escape.sub('', text)) if '\x1b' in text else len(text)
+
+# anything but printable ASCII (and colour codes), eg newlines or wide (CJK) characters
+not_plain_text = re.compile(r'[^\x20-\x7e\x1b]')
+
+def fast_table(header, rows):
+    """
+    Renders the same layout as terminaltables' AsciiTable for single line cells, measuring column widths
+    as the rows are converted rather than in a separate pass. Short rows (and header) are padded with empty cells.
+    Tables with multi line or non ASCII cells are left to AsciiTable.
+    """
+    header = [str(h) for h in header]
+    widths = [visible_len(h) for h in header]
+    lines = []
+    plain = not any(not_plain_text.search(h) for h in header)
+
+    for r in rows:
+        r = [str(c) for c in r]
+        widths = [max(w, l) for w, l in itertools.zip_longest(widths, map(visible_len, r), fillvalue=0)]
+        lines.append(r)
+
+        if plain and any(not_plain_text.search(c) for c in r):
+            plain = False
+
+    if not plain:
+        return AsciiTable([header, *lines]).table
+
+    border = "+" + "+".join("-" * (w + 2) for w in widths) + "+"
+
+    def line(r):
+        cells = itertools.zip_longest(r, widths, fillvalue='')
+        return "| " + " | ".join(c + " " * (w - visible_len(c)) for c, w in cells) + " |"
+
+    return "\n".join([border, line(header), border, *map(line, lines), border])
+
+# table name -> items for the command's JSON document, None unless --json was given
+json_output = None
+
+def set_json_output(enabled):
+    global json_output
+    json_output = {} if enabled else None
+
+def json_output_enabled():
+    return json_output is not None
+
+def json_default(o):
+    # isoformat matches what orjson does natively for datetimes
+    if isinstance(o, (datetime.date, datetime.time)):
+        return o.isoformat()
+    return str(o)
+
+def print_json(name, items):
+    """
+    Adds items (in place of a table) to the command's JSON document, written once by write_json_output.
+    """
+    json_output[name] = items
+
+def write_json_output():
+    """
+    Writes the collected tables to stdout as a single line of JSON, with orjson when installed.
+    """
+    try:
+        import orjson
+    except ImportError:
+        text = json.dumps(json_output, default=json_default)
+    else:
+        text = orjson.dumps(json_output, default=json_default).decode()
+
+    sys.stdout.write(text + "\n")
+
+def msg_stream():
+    # with --json stdout only carries the JSON document, messages go to stderr
+    return sys.stderr if json_output_enabled() else sys.stdout
+
 def print_table(header, data):
-    print("")
-    print(AsciiTable([header] + data).table)
-    print("")
+    # data can be any iterable of rows (eg a generator)
+    table = AsciiTable([header, *data]).table if pretty_tables else fast_table(header, data)
+
+    # one write rather than three prints (each a write, and a flush when line buffered)
+    sys.stdout.write("\n" + table + "\n\n")
 
 
 def dump(data):